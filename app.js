@@ -775,27 +775,30 @@ class LicenseViewer {
             
             // Show loading state
             barcodeContainer.style.display = 'block';
-            barcodeImg.src = '';
+            barcodeImg.removeAttribute('src');  // unlike src = '', doesn't fire onerror
             barcodeImg.alt = 'Generating barcode...';
             
             // Remove newlines and join for barcode encoding
             const compactData = aamvaText.replace(/\n/g, '');
             const encodedData = encodeURIComponent(compactData);
             
-            // Call server API to generate barcode
-            fetch(`/api/pdf417?data=${encodedData}`)
-                .then(response => response.json())
-                .then(data => {
-                    if (data.success) {
-                        barcodeImg.src = data.barcode;
-                        barcodeImg.alt = 'PDF417 Barcode';
-                    } else {
+            // Load the barcode PNG straight from the server API (cacheable by the browser)
+            const barcodeUrl = `/api/pdf417?data=${encodedData}`;
+            barcodeImg.onload = () => {
+                barcodeImg.alt = 'PDF417 Barcode';
+            };
+            barcodeImg.onerror = () => {
+                // Errors come back as JSON; fetch it again to show the message
+                fetch(barcodeUrl)
+                    .then(response => response.json())
+                    .then(data => {
                         barcodeContainer.innerHTML = '<p class="text-danger"><i class="fas fa-exclamation-circle me-2"></i>' + (data.error || 'Failed to generate barcode') + '</p>';
-                    }
-                })
-                .catch(error => {
-                    barcodeContainer.innerHTML = '<p class="text-danger"><i class="fas fa-exclamation-circle me-2"></i>Error: ' + error.message + '</p>';
-                });
+                    })
+                    .catch(error => {
+                        barcodeContainer.innerHTML = '<p class="text-danger"><i class="fas fa-exclamation-circle me-2"></i>Error: ' + error.message + '</p>';
+                    });
+            };
+            barcodeImg.src = barcodeUrl;
         });
 
         // 1D Barcode generation in modal
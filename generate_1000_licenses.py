@@ -6,16 +6,33 @@ Requires: credentials.json and Sheet ID in .env file
 import random
 import csv
 import json
-from datetime import date, timedelta
-from google_sheets import GoogleSheetsConnector
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+from itertools import islice
+from google_sheets import GoogleSheetsConnector, execute_with_backoff
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+class UploadError(Exception):
+    """A chunked upload failed part-way; records how much had already been appended"""
+    
+    def __init__(self, error, updated_rows, updated_cells):
+        super().__init__(f"{error} (after {updated_rows} rows / {updated_cells} cells were appended)")
+        self.updated_rows = updated_rows
+        self.updated_cells = updated_cells
+
 class LicenseGenerator:
-    def __init__(self):
+    # Letters used in license numbers (no I, O or Q) and for middle initials
+    _LICENSE_LETTERS = 'ABCDEFGHJKLMNPRSTUVWXYZ'
+    _ALPHA = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    
+    def __init__(self, seed=None):
+        # Instance-local PRNG so generators in different threads don't share state
+        self._rng = random.Random(seed)
+        
         # Data pools
         self.first_names = [
             "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", 
@@ -76,80 +93,159 @@ class LicenseGenerator:
         self.license_classes = ["C", "D", "C", "C", "C", "M", "B"]  # Weighted toward Class C
         self.restrictions = ["NONE", "A", "B", "A,B", "NONE", "NONE", "F"]
         
-    def generate_license_number(self, state):
-        """Generate state-specific license number"""
-        pattern = self.states_data[state]["pattern"]
-        license_num = ""
+        # State lookups cached once instead of rebuilt per entry
+        self._state_keys = tuple(self.states_data.keys())
+        self._state_cities = {state: tuple(data["cities"]) for state, data in self.states_data.items()}
+        
+        # License number patterns compiled once per state
+        self._compiled_patterns = {
+            state: self._compile_pattern(data["pattern"])
+            for state, data in self.states_data.items()
+        }
+        
+        # Specialized license number functions generated from the compiled patterns
+        self._license_fns = {
+            state: self._build_license_fn(ops)
+            for state, ops in self._compiled_patterns.items()
+        }
+        
+    def _compile_pattern(self, pattern):
+        """Compile a license pattern into a list of (kind, param) ops"""
+        ops = []
         
         for char in pattern:
             if char == '#':
-                license_num += str(random.randint(0, 9))
-            elif char == 'A':
-                license_num += random.choice('ABCDEFGHJKLMNPRSTUVWXYZ')
-            elif char == 'B':
-                license_num += random.choice('ABCDEFGHJKLMNPRSTUVWXYZ')
-            elif char == 'F':
-                license_num += 'F'
-            elif char == 'S':
-                license_num += 'S'
-            elif char == 'W':
-                license_num += 'WDL'
+                ops.append(('rand_digit',))
+            elif char in ('A', 'B'):
+                ops.append(('rand_letter',))
             else:
-                license_num += char
-                
-        return license_num
+                text = 'WDL' if char == 'W' else char
+                # Merge consecutive literals into a single op
+                if ops and ops[-1][0] == 'fixed':
+                    ops[-1] = ('fixed', ops[-1][1] + text)
+                else:
+                    ops.append(('fixed', text))
+        
+        return ops
+    
+    def _build_license_fn(self, ops):
+        """
+        Generate source for a function that inlines the compiled pattern, e.g.
+        CA's 'F#######' becomes 'F{}{}{}{}{}{}{}'.format(_randrange(10), ...),
+        so no per-character dispatch is left at call time
+        """
+        letters = self._LICENSE_LETTERS
+        template = []
+        args = []
+        
+        for op in ops:
+            if op[0] == 'rand_digit':
+                template.append('{}')
+                args.append('_randrange(10)')
+            elif op[0] == 'rand_letter':
+                template.append('{}')
+                args.append(f'_letters[_randrange({len(letters)})]')
+            else:
+                template.append(op[1].replace('{', '{{').replace('}', '}}'))
+        
+        source = f"def generate():\n    return {''.join(template)!r}.format({', '.join(args)})\n"
+        namespace = {'_randrange': self._rng.randrange, '_letters': letters}
+        exec(source, namespace)
+        return namespace['generate']
+    
+    def generate_license_number(self, state):
+        """Generate state-specific license number"""
+        return self._license_fns[state]()
+    
+    def _generate_license_numbers_bulk(self, np, rng, states):
+        """Generate license numbers for an array of states, one NumPy draw per state group"""
+        letters = np.array(list(self._LICENSE_LETTERS))
+        license_numbers = np.empty(len(states), dtype=object)
+        
+        for state, ops in self._compiled_patterns.items():
+            rows = np.flatnonzero(states == state)
+            if not len(rows):
+                continue
+            
+            n_digits = sum(op[0] == 'rand_digit' for op in ops)
+            n_letters = sum(op[0] == 'rand_letter' for op in ops)
+            digits = rng.integers(0, 10, (len(rows), n_digits)).astype(str)
+            chars = letters[rng.integers(0, len(letters), (len(rows), n_letters))]
+            
+            numbers = ''
+            digit_col = letter_col = 0
+            for op in ops:
+                if op[0] == 'rand_digit':
+                    numbers = np.char.add(numbers, digits[:, digit_col])
+                    digit_col += 1
+                elif op[0] == 'rand_letter':
+                    numbers = np.char.add(numbers, chars[:, letter_col])
+                    letter_col += 1
+                else:
+                    numbers = np.char.add(numbers, op[1])
+            
+            license_numbers[rows] = numbers
+        
+        return license_numbers.astype(str)
     
     def generate_date(self, start_year, end_year):
         """Generate random date between years"""
-        start = date(start_year, 1, 1)
-        end = date(end_year, 12, 31)
-        delta = (end - start).days
-        random_days = random.randint(0, delta)
-        return start + timedelta(days=random_days)
+        # Pick a proleptic Gregorian ordinal directly instead of date + timedelta
+        start = date(start_year, 1, 1).toordinal()
+        end = date(end_year, 12, 31).toordinal()
+        return date.fromordinal(self._rng.randint(start, end))
+    
+    @staticmethod
+    def _add_years(day, years):
+        """Same date `years` later; Feb 29 rolls over to Mar 1 in non-leap years"""
+        try:
+            return day.replace(year=day.year + years)
+        except ValueError:
+            return date(day.year + years, 3, 1)
     
     def generate_entry(self, entry_id):
         """Generate a single license entry"""
         # Personal info
-        first_name = random.choice(self.first_names)
-        last_name = random.choice(self.last_names)
-        middle = random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+        first_name = self._rng.choice(self.first_names)
+        last_name = self._rng.choice(self.last_names)
+        middle = self._rng.choice(self._ALPHA)
         
         # State and location
-        state = random.choice(list(self.states_data.keys()))
-        city = random.choice(self.states_data[state]["cities"])
+        state = self._rng.choice(self._state_keys)
+        city = self._rng.choice(self._state_cities[state])
         
         # Generate data
         dob = self.generate_date(1990, 2001)
         issue_date = self.generate_date(2018, 2023)
-        expiration_date = issue_date.replace(year=issue_date.year + random.choice([4, 5, 6]))
+        expiration_date = self._add_years(issue_date, self._rng.choice([4, 5, 6]))
         
         # Ensure expiration is in future
         if expiration_date < date.today():
-            expiration_date = expiration_date.replace(year=expiration_date.year + 4)
+            expiration_date = self._add_years(expiration_date, 4)
         
         # Physical description
-        height_feet = random.randint(5, 6)
-        height_inches = random.randint(0, 11)
+        height_feet = self._rng.randint(5, 6)
+        height_inches = self._rng.randint(0, 11)
         height = f"{height_feet}'{height_inches}\""
-        weight = random.randint(120, 250)
+        weight = self._rng.randint(120, 250)
         
         # Address
-        street_num = random.randint(100, 9999)
-        street = f"{street_num} {random.choice(self.streets)}"
-        zip_code = f"{random.randint(10000, 99999)}"
+        street_num = self._rng.randint(100, 9999)
+        street = f"{street_num} {self._rng.choice(self.streets)}"
+        zip_code = f"{self._rng.randint(10000, 99999)}"
         
         # License details
         license_number = self.generate_license_number(state)
-        license_class = random.choice(self.license_classes)
-        restriction = random.choice(self.restrictions)
-        organ_donor = random.choice(["YES", "NO", "YES", "YES"])  # Bias toward YES
+        license_class = self._rng.choice(self.license_classes)
+        restriction = self._rng.choice(self.restrictions)
+        organ_donor = self._rng.choice(["YES", "NO", "YES", "YES"])  # Bias toward YES
         
         return [
             entry_id,
             first_name,
             last_name,
             middle,
-            dob.strftime("%Y-%m-%d"),
+            dob.isoformat(),
             state,
             license_number,
             city,
@@ -157,14 +253,176 @@ class LicenseGenerator:
             zip_code,
             height,
             weight,
-            random.choice(self.eye_colors),
-            random.choice(self.hair_colors),
-            expiration_date.strftime("%Y-%m-%d"),
+            self._rng.choice(self.eye_colors),
+            self._rng.choice(self.hair_colors),
+            expiration_date.isoformat(),
             f"CLASS {license_class}",
             restriction,
             organ_donor
         ]
     
+    def generate_entries(self, count, start_id=1):
+        """Generate license entries, drawing each field for all rows up front"""
+        # Personal info
+        first_names = self._rng.choices(self.first_names, k=count)
+        last_names = self._rng.choices(self.last_names, k=count)
+        middles = self._rng.choices(self._ALPHA, k=count)
+        
+        # State and location
+        states = self._rng.choices(self._state_keys, k=count)
+        
+        # Generate data (as proleptic Gregorian ordinals)
+        dob_days = self._rng.choices(range(date(1990, 1, 1).toordinal(), date(2001, 12, 31).toordinal() + 1), k=count)
+        issue_days = self._rng.choices(range(date(2018, 1, 1).toordinal(), date(2023, 12, 31).toordinal() + 1), k=count)
+        valid_years = self._rng.choices([4, 5, 6], k=count)
+        today = date.today()
+        
+        # Physical description
+        height_feet = self._rng.choices(range(5, 7), k=count)
+        height_inches = self._rng.choices(range(0, 12), k=count)
+        weights = self._rng.choices(range(120, 251), k=count)
+        
+        # Address
+        street_nums = self._rng.choices(range(100, 10000), k=count)
+        streets = self._rng.choices(self.streets, k=count)
+        zip_codes = self._rng.choices(range(10000, 100000), k=count)
+        
+        # License details
+        license_classes = self._rng.choices(self.license_classes, k=count)
+        restrictions = self._rng.choices(self.restrictions, k=count)
+        organ_donors = self._rng.choices(["YES", "NO", "YES", "YES"], k=count)  # Bias toward YES
+        eye_colors = self._rng.choices(self.eye_colors, k=count)
+        hair_colors = self._rng.choices(self.hair_colors, k=count)
+        
+        for i in range(count):
+            state = states[i]
+            dob = date.fromordinal(dob_days[i])
+            issue_date = date.fromordinal(issue_days[i])
+            expiration_date = self._add_years(issue_date, valid_years[i])
+            
+            # Ensure expiration is in future
+            if expiration_date < today:
+                expiration_date = self._add_years(expiration_date, 4)
+            
+            yield [
+                start_id + i,
+                first_names[i],
+                last_names[i],
+                middles[i],
+                dob.isoformat(),
+                state,
+                self.generate_license_number(state),
+                self._rng.choice(self._state_cities[state]),
+                f"{street_nums[i]} {streets[i]}",
+                f"{zip_codes[i]}",
+                f"{height_feet[i]}'{height_inches[i]}\"",
+                weights[i],
+                eye_colors[i],
+                hair_colors[i],
+                expiration_date.isoformat(),
+                f"CLASS {license_classes[i]}",
+                restrictions[i],
+                organ_donors[i]
+            ]
+    
+    def generate_entries_bulk(self, count, start_id=1):
+        """Generate many license entries in one pass using vectorized NumPy sampling"""
+        try:
+            import numpy as np
+        except ImportError:
+            # Fall back to the pure-Python generator
+            return list(self.generate_entries(count, start_id))
+        
+        rng = np.random.default_rng(self._rng.getrandbits(64))
+        
+        def pick(pool):
+            pool = np.array(pool)
+            return pool[rng.integers(0, len(pool), count)]
+        
+        def random_dates(start_year, end_year):
+            start = np.datetime64(f"{start_year}-01-01")
+            span = (np.datetime64(f"{end_year}-12-31") - start).astype(int)
+            return start + rng.integers(0, span + 1, count)
+        
+        def add_years(days, years):
+            months = days.astype('datetime64[M]')
+            return (months + years * 12) + (days - months)
+        
+        # Personal info
+        first_names = pick(self.first_names)
+        last_names = pick(self.last_names)
+        middles = pick(list(self._ALPHA))
+        
+        # State and location (cities flattened into one table, indexed per state)
+        state_keys = self._state_keys
+        state_cities = [self._state_cities[s] for s in state_keys]
+        city_counts = np.array([len(c) for c in state_cities])
+        city_offsets = np.concatenate(([0], np.cumsum(city_counts)[:-1]))
+        all_cities = np.array([city for cities in state_cities for city in cities])
+        
+        state_idx = rng.integers(0, len(state_keys), count)
+        states = np.array(state_keys)[state_idx]
+        city_idx = (rng.random(count) * city_counts[state_idx]).astype(int)
+        cities = all_cities[city_offsets[state_idx] + city_idx]
+        
+        # Generate dates
+        dobs = random_dates(1990, 2001)
+        issue_dates = random_dates(2018, 2023)
+        expirations = add_years(issue_dates, pick([4, 5, 6]))
+        
+        # Ensure expiration is in future
+        expired = expirations < np.datetime64(date.today())
+        expirations[expired] = add_years(expirations[expired], 4)
+        
+        # Physical description
+        heights = np.char.add(
+            np.char.add(rng.integers(5, 7, count).astype(str), "'"),
+            np.char.add(rng.integers(0, 12, count).astype(str), '"')
+        )
+        weights = rng.integers(120, 251, count)
+        
+        # Address
+        streets = np.char.add(
+            np.char.add(rng.integers(100, 10000, count).astype(str), " "),
+            pick(self.streets)
+        )
+        zip_codes = rng.integers(10000, 100000, count).astype(str)
+        
+        # License details
+        license_numbers = self._generate_license_numbers_bulk(np, rng, states)
+        license_classes = np.char.add("CLASS ", pick(self.license_classes))
+        restrictions = pick(self.restrictions)
+        organ_donors = pick(["YES", "NO", "YES", "YES"])  # Bias toward YES
+        
+        columns = [
+            np.arange(start_id, start_id + count),
+            first_names,
+            last_names,
+            middles,
+            dobs.astype(str),
+            states,
+            license_numbers,
+            cities,
+            streets,
+            zip_codes,
+            heights,
+            weights,
+            pick(self.eye_colors),
+            pick(self.hair_colors),
+            expirations.astype(str),
+            license_classes,
+            restrictions,
+            organ_donors
+        ]
+        
+        # tolist() converts to native str/int so rows stay JSON serializable
+        return [list(row) for row in zip(*(column.tolist() for column in columns))]
+    
+    def iter_entries(self, count, batch_size=500):
+        """Yield license entries, generating them in bulk one batch at a time"""
+        for start in range(0, count, batch_size):
+            yield from self.generate_entries_bulk(min(batch_size, count - start), start_id=start + 1)
+    
     def generate_csv(self, count=1000, filename="driver_licenses_1000.csv"):
         """Generate CSV file with license entries"""
         headers = ["ID", "First Name", "Last Name", "Middle", "DOB", "State", 
@@ -172,15 +430,15 @@ class LicenseGenerator:
                   "Weight", "Eye Color", "Hair Color", "Expiration", 
                   "License Class", "Restrictions", "Organ Donor"]
         
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
+        # Report progress once per phase rather than from inside the generation loop
+        print(f"🚀 Generating {count} license entries...")
+        rows = self.generate_entries_bulk(count)
+        
+        # 1 MiB buffer keeps the write to a handful of syscalls
+        with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
             writer = csv.writer(f)
             writer.writerow(headers)
-            
-            for i in range(1, count + 1):
-                entry = self.generate_entry(i)
-                writer.writerow(entry)
-                if i % 100 == 0:
-                    print(f"Generated {i} entries...")
+            writer.writerows(rows)
         
         print(f"\n✅ CSV file created: {filename}")
         print(f"📊 Total entries: {count}")
@@ -245,59 +503,102 @@ class LicenseGenerator:
         print(f"📊 Total barcodes created: {count}")
         return True
     
+    def _append_one(self, connector, sheet_id, rows):
+        """Append a single batch of rows, returning the number of updated cells"""
+        request = connector.service.spreadsheets().values().append(
+            spreadsheetId=sheet_id,
+            range='Sheet1!A1',
+            # Cells are pre-serialized str/int, so skip server-side parsing
+            valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
+            body={'values': rows}
+        )
+        result = execute_with_backoff(request, http=connector.thread_http())
+        return result.get('updates', {}).get('updatedCells', 0)
+    
+    def _append_chunked(self, connector, sheet_id, rows, chunk=500, workers=4):
+        """
+        Append rows in fixed-size batches so large uploads stay under the write quota.
+        Batches are sent concurrently, so their order in the sheet is not guaranteed.
+        
+        rows may be any iterable; it is consumed lazily so only a few batches
+        are held in memory at once. Returns (updated_rows, updated_cells).
+        
+        If a batch fails, no further batches are sent and queued ones are
+        cancelled; UploadError reports what had been appended by then.
+        """
+        rows = iter(rows)
+        batches = iter(lambda: list(islice(rows, chunk)), [])
+        updated_rows = updated_cells = 0
+        pending = {}  # future -> rows in its batch
+        errors = []
+        
+        def collect(futures):
+            nonlocal updated_rows, updated_cells
+            for future in futures:
+                size = pending.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    updated_cells += future.result()
+                    updated_rows += size
+                except Exception as e:
+                    errors.append(e)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch in batches:
+                # Keep at most two batches per worker in flight
+                if len(pending) >= workers * 2:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                if errors:
+                    break
+                
+                pending[executor.submit(self._append_one, connector, sheet_id, batch)] = len(batch)
+            
+            if errors:
+                # Drop queued batches; the ones already sending finish and are counted below
+                executor.shutdown(cancel_futures=True)
+            collect(wait(pending).done)
+        
+        if errors:
+            raise UploadError(errors[0], updated_rows, updated_cells)
+        return updated_rows, updated_cells
+    
     def upload_to_google_sheets(self, sheet_id, count=1000):
         """Generate entries and append to Google Sheets (without clearing existing data)"""
-        print("🚀 Generating 1000 license entries...")
+        print(f"🚀 Generating {count} license entries...")
         
-        # Prepare data (without headers - we'll append to existing data)
-        data = []
-        
-        for i in range(1, count + 1):
-            entry = self.generate_entry(i)
-            data.append(entry)
-            if i % 100 == 0:
-                print(f"Generated {i} entries...")
+        # Prepare data lazily (without headers - we'll append to existing data);
+        # each batch is generated just before it is uploaded, so memory stays O(batch)
+        data = self.iter_entries(count)
         
-        print(f"\n✅ Generated {count} license entries")
         print("📤 Uploading to Google Sheets...")
         
         # Connect to Google Sheets
         try:
-            connector = GoogleSheetsConnector('credentials.json')
+            connector = GoogleSheetsConnector.get('credentials.json')
             
             if not connector.service:
                 print("❌ Failed to connect to Google Sheets API")
                 print("Check if credentials.json exists and is valid")
                 return False
             
-            # Get the next available row
-            print("📊 Finding next available row...")
-            result = connector.service.spreadsheets().values().get(
-                spreadsheetId=sheet_id,
-                range='Sheet1!A:A'
-            ).execute()
-            
-            values = result.get('values', [])
-            next_row = len(values) + 1
-            
-            # Append new data
-            print(f"📤 Appending new data starting at row {next_row}...")
-            body = {
-                'values': data
-            }
-            
-            result = connector.service.spreadsheets().values().append(
-                spreadsheetId=sheet_id,
-                range=f'Sheet1!A{next_row}',
-                valueInputOption='RAW',
-                body=body
-            ).execute()
+            # Append new data (Sheets finds the next free row server-side)
+            print("📤 Appending new data after the last row...")
+            _, updated_cells = self._append_chunked(connector, sheet_id, data)
+            connector.invalidate_cache(sheet_id)
             
-            print(f"✅ Successfully uploaded {result.get('updates', {}).get('updatedCells')} cells")
+            print(f"✅ Successfully uploaded {updated_cells} cells")
             print(f"📊 {count} new license entries appended to your Google Sheet")
+            print("ℹ️ Batches are uploaded in parallel, so rows may not be in ID order")
             print(f"🔗 Sheet URL: https://docs.google.com/spreadsheets/d/{sheet_id}/edit")
             
             return True
+        
+        except UploadError as e:
+            print(f"❌ Upload stopped: {e}")
+            print(f"⚠️ {e.updated_rows} rows were already appended; remove them before retrying to avoid duplicates")
+            return False
             
         except Exception as e:
             print(f"❌ Error uploading to Google Sheets: {e}")
@@ -314,46 +615,32 @@ class LicenseGenerator:
         try:
             with open(csv_file, 'r', encoding='utf-8') as f:
                 reader = csv.reader(f)
-                data = list(reader)
-            
-            # Skip header row if present (assume first row is headers)
-            data_to_append = data[1:] if len(data) > 1 else data
-            print(f"📊 Found {len(data_to_append)} entries in CSV")
-            
-            # Connect to Google Sheets
-            connector = GoogleSheetsConnector('credentials.json')
-            
-            if not connector.service:
-                print("❌ Failed to connect to Google Sheets API")
-                return False
-            
-            # Get the next available row
-            print("📊 Finding next available row...")
-            result = connector.service.spreadsheets().values().get(
-                spreadsheetId=sheet_id,
-                range='Sheet1!A:A'
-            ).execute()
-            
-            values = result.get('values', [])
-            next_row = len(values) + 1
-            
-            # Append data
-            print(f"📤 Appending data starting at row {next_row}...")
-            body = {
-                'values': data_to_append
-            }
-            
-            result = connector.service.spreadsheets().values().append(
-                spreadsheetId=sheet_id,
-                range=f'Sheet1!A{next_row}',
-                valueInputOption='RAW',
-                body=body
-            ).execute()
+                
+                # Skip header row (assume first row is headers)
+                next(reader, None)
+                
+                # Connect to Google Sheets
+                connector = GoogleSheetsConnector.get('credentials.json')
+                
+                if not connector.service:
+                    print("❌ Failed to connect to Google Sheets API")
+                    return False
+                
+                # Stream rows straight from the file (Sheets finds the next free row server-side)
+                print("📤 Appending data after the last row...")
+                updated_rows, updated_cells = self._append_chunked(connector, sheet_id, reader)
+                connector.invalidate_cache(sheet_id)
             
-            print(f"✅ Successfully uploaded {result.get('updates', {}).get('updatedCells')} cells")
-            print(f"📊 {len(data_to_append)} license entries appended to your Google Sheet")
+            print(f"✅ Successfully uploaded {updated_cells} cells")
+            print(f"📊 {updated_rows} license entries appended to your Google Sheet")
+            print("ℹ️ Batches are uploaded in parallel, so rows may not be in file order")
             
             return True
+        
+        except UploadError as e:
+            print(f"❌ Upload stopped: {e}")
+            print(f"⚠️ {e.updated_rows} rows were already appended; remove them before retrying to avoid duplicates")
+            return False
             
         except FileNotFoundError:
             print(f"❌ CSV file not found: {csv_file}")
@@ -3,20 +3,101 @@ Google Sheets API Connection Module
 Handles reading data from Google Sheets
 """
 
+import gzip
 import os
+import random
+import threading
+import time
+import httplib2
+from cachetools import TTLCache
+from config import config
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+# HTTP statuses worth retrying: quota exceeded and backend unavailable
+RETRYABLE_STATUSES = (429, 503)
+
+def execute_with_backoff(request, http=None, max_retries=6):
+    """
+    Execute a Sheets API request, retrying quota/availability errors
+    with Google's recommended truncated exponential backoff
+    
+    Args:
+        request: An un-executed googleapiclient request
+        http: Optional HTTP client to send it on (defaults to the service's)
+        max_retries: Number of retries before giving up
+    
+    Returns:
+        The API response
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return request.execute(http=http)
+        except HttpError as err:
+            if err.resp.status not in RETRYABLE_STATUSES or attempt == max_retries:
+                raise
+            delay = min(2 ** attempt + random.random(), 64)
+            print(f"⏳ Sheets API returned {err.resp.status}, retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+class GzipHttp(httplib2.Http):
+    """httplib2 client that gzip-compresses large request bodies"""
+    
+    # Bodies smaller than this aren't worth compressing
+    MIN_COMPRESS_SIZE = 1024
+    
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        if method in ('POST', 'PUT', 'PATCH') and body and len(body) > self.MIN_COMPRESS_SIZE:
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            body = gzip.compress(body, compresslevel=6)
+            
+            # googleapiclient already set content-length for the uncompressed body
+            headers = {k: v for k, v in (headers or {}).items() if k.lower() != 'content-length'}
+            headers['content-encoding'] = 'gzip'
+            headers['content-length'] = str(len(body))
+        
+        return super().request(uri, method, body, headers, *args, **kwargs)
+
+# Authenticated connectors, keyed by credentials file
+_service_cache = {}
+
 class GoogleSheetsConnector:
-    def __init__(self, credentials_file='credentials.json'):
+    @classmethod
+    def get(cls, credentials_file='credentials.json'):
+        """
+        Return a shared connector for the credentials file, authenticating
+        only on first use within the process
+        
+        Args:
+            credentials_file: Path to service account credentials JSON file
+        """
+        connector = _service_cache.get(credentials_file)
+        if connector is None:
+            connector = cls(credentials_file)
+            # Don't cache failed logins so the next call can retry
+            if connector.service:
+                _service_cache[credentials_file] = connector
+        return connector
+    
+    def __init__(self, credentials_file='credentials.json', cache_ttl=None):
         """
         Initialize Google Sheets API connection
         
         Args:
             credentials_file: Path to service account credentials JSON file
+            cache_ttl: Seconds to keep sheet reads cached (defaults to CACHE_TIMEOUT)
         """
         self.credentials_file = credentials_file
+        self.credentials = None
+        self._local = threading.local()
+        
+        # Recent reads keyed by (spreadsheet_id, range_name); TTLCache isn't thread-safe
+        self._cache = TTLCache(maxsize=32, ttl=cache_ttl if cache_ttl is not None else config.CACHE_TIMEOUT)
+        self._cache_lock = threading.Lock()
+        
         self.service = self.authenticate()
     
     def authenticate(self):
@@ -28,8 +109,18 @@ class GoogleSheetsConnector:
                 scopes=['https://www.googleapis.com/auth/spreadsheets']
             )
             
-            # Build the Sheets API service
-            service = build('sheets', 'v4', credentials=credentials)
+            self.credentials = credentials
+            
+            # One persistent HTTP client so every execute() reuses the warm TCP/TLS connection
+            http = AuthorizedHttp(credentials, http=GzipHttp())
+            
+            # Build the Sheets API service from the bundled discovery document
+            service = build(
+                'sheets', 'v4',
+                http=http,
+                cache_discovery=False,
+                static_discovery=True
+            )
             print("✅ Google Sheets API authenticated successfully (with read/write access)")
             return service
             
@@ -37,6 +128,33 @@ class GoogleSheetsConnector:
             print(f"❌ Authentication failed: {e}")
             return None
     
+    def thread_http(self):
+        """
+        Return an authorized HTTP client owned by the calling thread
+        
+        httplib2 connections are not thread-safe, so worker threads must
+        execute requests on their own client rather than the service's.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=GzipHttp())
+            self._local.http = http
+        return http
+    
+    def invalidate_cache(self, spreadsheet_id=None):
+        """
+        Drop cached reads so the next call hits the API
+        
+        Args:
+            spreadsheet_id: Only drop reads of this sheet (default: all)
+        """
+        with self._cache_lock:
+            if spreadsheet_id is None:
+                self._cache.clear()
+                return
+            for key in [key for key in self._cache if key[0] == spreadsheet_id]:
+                self._cache.pop(key, None)
+    
     def get_sheet_data(self, spreadsheet_id, range_name='Sheet1!A1:Z1000'):
         """
         Get data from Google Sheets
@@ -53,20 +171,31 @@ class GoogleSheetsConnector:
                 print("❌ Service not initialized. Authentication failed.")
                 return []
             
-            # Call the Sheets API
+            cache_key = (spreadsheet_id, range_name)
+            with self._cache_lock:
+                values = self._cache.get(cache_key)
+            if values is not None:
+                print(f"📦 Using cached sheet data ({len(values)} rows)")
+                return values
+            
+            # Call the Sheets API (batchGet, retrying quota errors with backoff)
             sheet = self.service.spreadsheets()
-            result = sheet.values().get(
+            request = sheet.values().batchGet(
                 spreadsheetId=spreadsheet_id,
-                range=range_name
-            ).execute()
+                ranges=[range_name]
+            )
+            result = execute_with_backoff(request, http=self.thread_http())
             
-            values = result.get('values', [])
+            value_ranges = result.get('valueRanges', [])
+            values = value_ranges[0].get('values', []) if value_ranges else []
             
             if not values:
                 print("❌ No data found in the sheet.")
                 return []
             
             print(f"✅ Retrieved {len(values)} rows from Google Sheets")
+            with self._cache_lock:
+                self._cache[cache_key] = values
             return values
             
         except HttpError as err:
@@ -103,24 +232,28 @@ class GoogleSheetsConnector:
                 continue
             
             try:
-                # Map sheet columns to license fields
+                # Pad short rows once so every field can be unpacked directly
                 # Sheet structure: A=# B=First C=Last D=Middle E=DOB F=State G=License# H=City I=Street J=ZIP K=Height L=Weight M=Eye N=Hair O=Expiration
+                padded = row + [''] * (15 - len(row))
+                (_, first_name, last_name, middle, dob, state, license_number, city,
+                 street, zip_code, height, weight, eye_color, hair_color, expiration) = padded[:15]
+                
                 license_data = {
                     'id': i + 1,
-                    'firstName': row[1] if len(row) > 1 else '',
-                    'lastName': row[2] if len(row) > 2 else '',
-                    'middleInitial': row[3] if len(row) > 3 else '',
-                    'dateOfBirth': row[4] if len(row) > 4 else '',
-                    'state': row[5] if len(row) > 5 else '',
-                    'licenseNumber': row[6] if len(row) > 6 else '',
-                    'city': row[7] if len(row) > 7 else '',
-                    'street': row[8] if len(row) > 8 else '',
-                    'zipCode': row[9] if len(row) > 9 else '',
-                    'height': row[10] if len(row) > 10 else '',
-                    'weight': int(row[11]) if len(row) > 11 and str(row[11]).isdigit() else 0,
-                    'eyeColor': row[12] if len(row) > 12 else '',
-                    'hairColor': row[13] if len(row) > 13 else '',
-                    'expiration': row[14] if len(row) > 14 else '',
+                    'firstName': first_name,
+                    'lastName': last_name,
+                    'middleInitial': middle,
+                    'dateOfBirth': dob,
+                    'state': state,
+                    'licenseNumber': license_number,
+                    'city': city,
+                    'street': street,
+                    'zipCode': zip_code,
+                    'height': height,
+                    'weight': int(weight) if str(weight).isdigit() else 0,
+                    'eyeColor': eye_color,
+                    'hairColor': hair_color,
+                    'expiration': expiration,
                     'licenseClass': '',
                     'restrictions': '',
                     'organDonor': False
@@ -2,48 +2,122 @@
 Enhanced Flask Server with Google Sheets Integration
 """
 
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, Response, abort, send_file, send_from_directory, request
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
-import json
-from datetime import datetime
+import re
+import gzip
+import zlib
+import mmap
+import hashlib
+import threading
+import time
+import orjson
+import numpy as np
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
 from google_sheets import GoogleSheetsConnector
 import requests
 import base64
 from io import BytesIO
 
+# Prefer the native zxing-cpp PDF417 encoder when it is installed
+try:
+    import zxingcpp
+except ImportError:
+    zxingcpp = None
+PDF417_BACKEND = 'zxing-cpp' if zxingcpp else 'pdf417'
+
+# gzip/brotli response compression (brotli comes with flask-compress)
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compile the stats kernel with Numba when it is installed
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+def strip_compressed_etags(wsgi_app):
+    """
+    Flask-Compress appends ':br'/':gzip' to the ETag of a response it compresses;
+    strip it from If-None-Match so conditional requests still match the route's ETag
+    """
+    def middleware(environ, start_response):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            environ['HTTP_IF_NONE_MATCH'] = re.sub(r':(?:br|gzip)"', '"', if_none_match)
+        return wsgi_app(environ, start_response)
+    return middleware
+
+# Compress JSON/text responses that aren't already compressed by the route
+# (/api/licenses compresses its own bodies, including streamed ones, incrementally)
+app.config.update(COMPRESS_ALGORITHM=['br', 'gzip'], COMPRESS_LEVEL=4, COMPRESS_BR_LEVEL=4)
+if Compress:
+    Compress(app)
+    app.wsgi_app = strip_compressed_etags(app.wsgi_app)
+
 # Configuration
 CONFIG = {
     "GOOGLE_SHEET_ID": os.getenv("GOOGLE_SHEET_ID", "YOUR_SHEET_ID_HERE"),
     "CREDENTIALS_FILE": os.getenv("CREDENTIALS_FILE", "credentials.json"),
     "CACHE_TIMEOUT": int(os.getenv("CACHE_TIMEOUT", "300")),
-    "DEBUG": os.getenv("DEBUG", "True").lower() == "true"
+    "DEBUG": os.getenv("DEBUG", "True").lower() == "true",
+    "HOST": os.getenv("HOST", "127.0.0.1"),  # set to 0.0.0.0 to listen on the network
+    "THREADS": int(os.getenv("THREADS", "16")),
+    "STREAM_THRESHOLD": int(os.getenv("STREAM_THRESHOLD", "5000")),
+    "STATIC_MAX_AGE": int(os.getenv("STATIC_MAX_AGE", "3600"))
 }
 
+# Only web assets are served from the app directory; credentials, .env, sources
+# and data files are refused rather than cached by browsers and proxies
+STATIC_EXTENSIONS = {'.htm', '.html', '.js', '.css', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.woff', '.woff2'}
+
 # Check if credentials are in environment variable (for cloud deployment)
 credentials_json_str = os.getenv("GOOGLE_CREDENTIALS")
 if credentials_json_str:
     try:
-        credentials_data = json.loads(credentials_json_str)
+        # Reject malformed JSON, but write the text as-is instead of re-serializing it
+        orjson.loads(credentials_json_str)
         temp_creds_path = "/tmp/credentials.json"
-        with open(temp_creds_path, 'w') as f:
-            json.dump(credentials_data, f)
+        Path(temp_creds_path).write_text(credentials_json_str)
         CONFIG["CREDENTIALS_FILE"] = temp_creds_path
     except Exception as e:
         pass
 
 
+def dumps(payload):
+    """Serialize to JSON bytes with orjson (datetimes are encoded natively as ISO 8601)"""
+    return orjson.dumps(payload, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def ojson(payload, status=200):
+    """Build a JSON response"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
 # Initialize Google Sheets connector
 sheets_connector = None
-cached_data = None
-cache_timestamp = None
+license_cache = None  # current LicenseCache, replaced whole on every refresh
+
+# Only one request refreshes the cache at a time; the rest wait and reuse its result
+_refresh_lock = threading.Lock()
+
+# Background thread that keeps the cache warm, started on the first request
+_refresh_thread = None
+_refresh_thread_lock = threading.Lock()
 
 def init_google_sheets():
     """Initialize Google Sheets connection"""
@@ -60,233 +134,505 @@ def init_google_sheets():
         print(f"❌ Failed to initialize Google Sheets: {e}")
         sheets_connector = None
 
-def get_license_data(force_refresh=False):
-    """Get license data from Google Sheets (with caching)"""
-    global cached_data, cache_timestamp, sheets_connector
+def parse_expiration(value):
+    """Parse a YYYY-MM-DD expiration date, or None if missing/invalid"""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def field_text(item, key, default=''):
+    """A license field as text; null, missing or non-string values are coerced"""
+    value = item.get(key)
+    return str(value) if value not in (None, '') else default
+
+def build_columns(licenses):
+    """
+    Build a columnar (one array per field) view of the licenses so filters
+    and stats run as NumPy array operations instead of per-row Python loops
+    """
+    expirations = [parse_expiration(item.get('expiration', '')) for item in licenses]
+    
+    return {
+        # Searchable fields joined with NUL so a term can't match across fields
+        'search_blob': np.array([
+            '\0'.join((field_text(item, 'firstName'), field_text(item, 'lastName'), field_text(item, 'licenseNumber'))).lower()
+            for item in licenses
+        ], dtype=str),
+        'state': np.array([field_text(item, 'state', 'Unknown') for item in licenses], dtype=str),
+        'state_upper': np.char.upper(np.array([field_text(item, 'state') for item in licenses], dtype=str)),
+        'organ_donor': np.array([bool(item.get('organDonor')) for item in licenses], dtype=bool),
+        # Expiration as date ordinals, -1 when missing or invalid
+        'exp_ord': np.array([d.toordinal() if d else -1 for d in expirations], dtype=np.int32)
+    }
+
+def days_until_expiration(columns, today):
+    """Days until each license expires, plus a mask of rows with a valid date"""
+    exp_ord = columns['exp_ord']
+    return exp_ord - today.toordinal(), exp_ord >= 0
+
+if njit:
+    @njit(parallel=True, cache=True)
+    def _parallel_status_counts(exp_ord, today_ord):
+        """Count (expired, expiring, valid) licenses in one parallel pass"""
+        expired = expiring = valid = 0
+        for i in prange(exp_ord.shape[0]):
+            if exp_ord[i] >= 0:
+                delta = exp_ord[i] - today_ord
+                if delta < 0:
+                    expired += 1
+                elif delta <= 30:
+                    expiring += 1
+                else:
+                    valid += 1
+        return expired, expiring, valid
+    
+    # Numba's workqueue threading layer (used when neither TBB nor OpenMP is
+    # available) aborts the process if two threads launch parallel kernels at once
+    _status_counts_lock = threading.Lock()
+    
+    def _status_counts(exp_ord, today_ord):
+        """Count (expired, expiring, valid) licenses, one calling thread at a time"""
+        with _status_counts_lock:
+            return _parallel_status_counts(exp_ord, today_ord)
+else:
+    def _status_counts(exp_ord, today_ord):
+        """Count (expired, expiring, valid) licenses with NumPy masks"""
+        has_date = exp_ord >= 0
+        delta = exp_ord - today_ord
+        return (
+            int(np.count_nonzero(has_date & (delta < 0))),
+            int(np.count_nonzero(has_date & (delta >= 0) & (delta <= 30))),
+            int(np.count_nonzero(has_date & (delta > 30)))
+        )
+
+class LicenseCache:
+    """
+    One loaded generation of license data together with everything derived
+    from it. It is built completely before being published, and never
+    modified afterwards, so a request that reads license_cache once sees
+    rows, columns, index and ETag that all belong together. Instances hash
+    by identity, which makes them the cache key for the memoized helpers.
+    """
+    __slots__ = ('data', 'columns', 'index', 'timestamp', 'etag')
+    
+    def __init__(self, licenses, timestamp=None):
+        self.data = licenses
+        self.columns = build_columns(licenses)
+        # Built in reverse so the first license with a given id wins, as with a scan
+        self.index = {item.get('id'): item for item in reversed(licenses)}
+        self.timestamp = timestamp
+        self.etag = hashlib.blake2b(orjson.dumps(licenses), digest_size=16).hexdigest() if licenses else None
+
+# Served when nothing could be loaded
+EMPTY_CACHE = LicenseCache([])
+
+def set_cached_data(licenses):
+    """Build a new cache generation from freshly loaded licenses and publish it"""
+    global license_cache
     
+    cache = LicenseCache(licenses, datetime.now())
+    # Precompute today's stats before any request can see the new data
+    cache_stats.cache_clear()
+    cache_stats(cache, datetime.now().date())
+    license_cache = cache
+    
+    # Drop results for older generations; they can no longer be requested
+    filter_licenses.cache_clear()
+    render_licenses.cache_clear()
+    compress_licenses.cache_clear()
+    return cache
+
+def cache_is_fresh(cache):
+    """Whether the cache is loaded and younger than CACHE_TIMEOUT"""
+    if cache is None or not cache.data:
+        return False
+    elapsed = (datetime.now() - cache.timestamp).total_seconds()
+    return elapsed < CONFIG["CACHE_TIMEOUT"]
+
+def get_license_data(force_refresh=False, keep_on_failure=False):
+    """
+    Get the license cache, loading it from Google Sheets if needed. With
+    keep_on_failure, a failed Sheets load keeps the data already cached
+    instead of falling back to the sample data.
+    """
     # Check if cache is still valid
-    if not force_refresh and cached_data and cache_timestamp:
-        elapsed = (datetime.now() - cache_timestamp).total_seconds()
-        if elapsed < CONFIG["CACHE_TIMEOUT"]:
-            print(f"📦 Using cached data ({len(cached_data)} licenses)")
-            return cached_data
+    cache = license_cache
+    if not force_refresh and cache_is_fresh(cache):
+        print(f"📦 Using cached data ({len(cache.data)} licenses)")
+        return cache
     
-    # Try to get data from Google Sheets
-    if sheets_connector and CONFIG["GOOGLE_SHEET_ID"] != "YOUR_SHEET_ID_HERE":
+    with _refresh_lock:
+        # Another request may have refreshed the cache while we waited
+        cache = license_cache
+        if not force_refresh and cache_is_fresh(cache):
+            return cache
+        
+        # Try to get data from Google Sheets
+        if sheets_connector and CONFIG["GOOGLE_SHEET_ID"] != "YOUR_SHEET_ID_HERE":
+            try:
+                if force_refresh:
+                    sheets_connector.invalidate_cache(CONFIG["GOOGLE_SHEET_ID"])
+                licenses = sheets_connector.get_license_data(CONFIG["GOOGLE_SHEET_ID"])
+                if licenses:
+                    return set_cached_data(licenses)
+            except Exception as e:
+                pass
+            
+            if keep_on_failure and cache is not None and cache.data:
+                print("⚠️ Google Sheets refresh failed. Keeping the current data.")
+                return cache
+        
+        # Fallback to sample data
+        try:
+            # Parse straight out of the mapped file rather than reading it into a buffer first
+            with open('sample_data.json', 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                with memoryview(buf) as view:
+                    licenses = orjson.loads(view)
+            return set_cached_data(licenses)
+        except:
+            return EMPTY_CACHE
+
+def refresh_periodically():
+    """Reload the cache shortly before it would go stale, so requests never wait on Sheets"""
+    interval = max(CONFIG["CACHE_TIMEOUT"] - 10, 1)
+    while True:
+        time.sleep(interval)
         try:
-            licenses = sheets_connector.get_license_data(CONFIG["GOOGLE_SHEET_ID"])
-            if licenses:
-                cached_data = licenses
-                cache_timestamp = datetime.now()
-                return licenses
+            get_license_data(force_refresh=True, keep_on_failure=True)
         except Exception as e:
-            pass
+            print(f"❌ Background refresh failed: {e}")
+
+def start_background_refresh():
+    """Start the refresh thread once per process"""
+    global _refresh_thread
     
-    # Fallback to sample data
-    try:
-        with open('sample_data.json', 'r') as f:
-            cached_data = json.load(f)
-            cache_timestamp = datetime.now()
-            return cached_data
-    except:
-        return []
+    if _refresh_thread is not None:
+        return
+    with _refresh_thread_lock:
+        if _refresh_thread is None:
+            _refresh_thread = threading.Thread(target=refresh_periodically, name='license-refresh', daemon=True)
+            _refresh_thread.start()
+
+def current_cache():
+    """
+    License cache for request handlers, which should read it once per request.
+    Refreshing happens in the background thread; a request only loads the
+    data itself if nothing is cached yet.
+    """
+    start_background_refresh()
+    cache = license_cache
+    if cache is None:
+        return get_license_data()
+    return cache
 
 # Initialize on startup
 init_google_sheets()
 
-# Serve static files
+def response_etag(cache, today, *parts):
+    """
+    ETag for a response derived from the cached data. Today's date is mixed in
+    because expiration status and stats change when the day rolls over.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (cache.etag, today.isoformat()) + parts:
+        digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+def cacheable(response, etag):
+    """
+    Attach the ETag and client caching headers to a response. Clients must
+    revalidate every time (usually getting a 304), so a refresh shows up at once.
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds this ETag, else None"""
+    if etag in request.if_none_match:
+        return cacheable(Response(status=304), etag)
+    return None
+
+# Serve static files (browsers cache them and revalidate with If-None-Match/If-Modified-Since)
 @app.route('/')
 def index():
-    return send_from_directory('.', 'index.htm')
+    return send_from_directory('.', 'index.htm', max_age=CONFIG["STATIC_MAX_AGE"], conditional=True)
 
 @app.route('/<path:filename>')
 def serve_file(filename):
-    return send_from_directory('.', filename)
+    if os.path.splitext(filename)[1].lower() not in STATIC_EXTENSIONS:
+        abort(404)
+    return send_from_directory('.', filename, max_age=CONFIG["STATIC_MAX_AGE"], conditional=True)
 
 # API endpoint to get all licenses
 @app.route('/api/licenses')
 def get_licenses():
     """Get all driver's licenses"""
     try:
-        data = get_license_data()
+        cache = current_cache()
         
-        # Apply filters from query parameters
-        filtered_data = apply_filters(data, request.args)
+        # One date for the ETag, the filters and the memo keys, even across midnight
+        today = datetime.now().date()
         
-        return jsonify({
-            "success": True,
-            "count": len(filtered_data),
-            "total": len(data),
-            "timestamp": cache_timestamp.isoformat() if cache_timestamp else None,
-            "source": "google_sheets" if sheets_connector else "sample_data",
-            "licenses": filtered_data
-        })
+        # Skip filtering and serialization entirely if the client is up to date
+        etag = response_etag(cache, today, request.query_string)
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        key = (cache, today, tuple(sorted(request.args.items())))
+        filtered_data = filter_licenses(*key)
+        
+        encoding = response_encoding()
+        
+        if len(filtered_data) > CONFIG["STREAM_THRESHOLD"]:
+            # Encode (and compress) large results as they are sent instead of building one big body
+            body = stream_licenses(cache, filtered_data)
+            response = Response(compress_stream(body, encoding) if encoding else body, mimetype='application/json')
+        elif encoding:
+            # Serve bytes compressed once per cache generation instead of per request
+            response = Response(compress_licenses(*key, encoding), mimetype='application/json')
+        else:
+            response = Response(render_licenses(*key), mimetype='application/json')
+        
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return cacheable(response, etag)
     
     except Exception as e:
-        return jsonify({
+        return ojson({
             "success": False,
             "error": str(e),
-            "timestamp": datetime.now().isoformat()
-        }), 500
+            "timestamp": datetime.now()
+        }, 500)
+
+@lru_cache(maxsize=256)
+def filter_licenses(cache, today, args_key):
+    """Apply query filters once per cache generation, day and query"""
+    return apply_filters(cache.data, cache.columns, dict(args_key), today)
+
+@lru_cache(maxsize=256)
+def render_licenses(cache, today, args_key):
+    """
+    Serialize a filtered license list once per cache generation, day and
+    query; repeat requests get the stored bytes back without any work
+    """
+    return b''.join(stream_licenses(cache, filter_licenses(cache, today, args_key)))
+
+@lru_cache(maxsize=256)
+def compress_licenses(cache, today, args_key, encoding):
+    """Compress a rendered license list once per cache generation, day, query and encoding"""
+    body = render_licenses(cache, today, args_key)
+    if encoding == 'br':
+        return brotli.compress(body, quality=app.config['COMPRESS_BR_LEVEL'])
+    return gzip.compress(body, compresslevel=app.config['COMPRESS_LEVEL'], mtime=0)
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed body incrementally, chunk by chunk"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=app.config['COMPRESS_BR_LEVEL'])
+        compress, finish = compressor.process, compressor.finish
+    else:
+        # wbits=31 writes a gzip header and trailer
+        compressor = zlib.compressobj(app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+    
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+def response_encoding():
+    """Best compression the client accepts (br only if brotli is installed), or None"""
+    return request.accept_encodings.best_match(['br', 'gzip'] if brotli else ['gzip'])
+
+def stream_licenses(cache, licenses, batch_size=500):
+    """Yield the /api/licenses JSON body piece by piece, encoding licenses in batches"""
+    head = dumps({
+        "success": True,
+        "count": len(licenses),
+        "total": len(cache.data),
+        "timestamp": cache.timestamp,
+        "source": "google_sheets" if sheets_connector else "sample_data"
+    })
+    yield head[:-1] + b',"licenses":['
+    
+    for start in range(0, len(licenses), batch_size):
+        # Strip the brackets off each encoded batch and splice them together
+        batch = dumps(licenses[start:start + batch_size])[1:-1]
+        yield batch if start == 0 else b',' + batch
+    
+    yield b']}'
 
 @app.route('/api/licenses/<int:license_id>')
 def get_license(license_id):
     """Get a specific license by ID"""
     try:
-        data = get_license_data()
-        
         # Find license by ID
-        license_data = next((item for item in data if item.get('id') == license_id), None)
+        license_data = current_cache().index.get(license_id)
         
         if license_data:
-            return jsonify({
+            return ojson({
                 "success": True,
                 "license": license_data
             })
         else:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": f"License with ID {license_id} not found"
-            }), 404
+            }, 404)
     
     except Exception as e:
-        return jsonify({
+        return ojson({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 @app.route('/api/refresh')
 def refresh_data():
     """Force refresh data from Google Sheets"""
     try:
-        global cached_data, cache_timestamp
-        cached_data = None
-        cache_timestamp = None
+        count = len(get_license_data(force_refresh=True).data)
         
-        data = get_license_data(force_refresh=True)
-        
-        return jsonify({
+        return ojson({
             "success": True,
-            "message": f"Data refreshed. {len(data)} licenses loaded.",
-            "count": len(data),
-            "timestamp": datetime.now().isoformat()
+            "message": f"Data refreshed. {count} licenses loaded.",
+            "count": count,
+            "timestamp": datetime.now()
         })
     
     except Exception as e:
-        return jsonify({
+        return ojson({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 @app.route('/api/stats')
 def get_stats():
     """Get statistics about licenses"""
     try:
-        data = get_license_data()
-        
-        # Calculate statistics
-        stats = {
-            "total_licenses": len(data),
-            "by_state": {},
-            "expiring_soon": 0,
-            "expired": 0,
-            "organ_donors": 0
-        }
+        cache = current_cache()
         
         today = datetime.now().date()
+        etag = response_etag(cache, today, 'stats')
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
         
-        for license_data in data:
-            # Count by state
-            state = license_data.get('state', 'Unknown')
-            stats["by_state"][state] = stats["by_state"].get(state, 0) + 1
-            
-            # Count organ donors
-            if license_data.get('organDonor'):
-                stats["organ_donors"] += 1
-            
-            # Check expiration
-            exp_date_str = license_data.get('expiration', '')
-            if exp_date_str:
-                try:
-                    exp_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
-                    days_until = (exp_date - today).days
-                    
-                    if days_until < 0:
-                        stats["expired"] += 1
-                    elif days_until <= 30:
-                        stats["expiring_soon"] += 1
-                except:
-                    pass
-        
-        return jsonify({
+        return cacheable(ojson({
             "success": True,
-            "stats": stats,
-            "timestamp": datetime.now().isoformat()
-        })
+            "stats": cache_stats(cache, today),
+            "timestamp": datetime.now()
+        }), etag)
     
     except Exception as e:
-        return jsonify({
+        return ojson({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
+
+def compute_stats(data, columns, today):
+    """Calculate statistics over the columnar view of the licenses"""
+    states, state_counts = np.unique(columns['state'], return_counts=True)
+    expired, expiring, _ = _status_counts(columns['exp_ord'], today.toordinal())
+    
+    return {
+        "total_licenses": len(data),
+        "by_state": dict(zip(states.tolist(), state_counts.tolist())),
+        "expiring_soon": int(expiring),
+        "expired": int(expired),
+        "organ_donors": int(np.count_nonzero(columns['organ_donor']))
+    }
 
-def apply_filters(data, filters):
-    """Apply filters to license data"""
+@lru_cache(maxsize=4)
+def cache_stats(cache, today):
+    """Stats for a cache generation, computed once per day (first when it is loaded)"""
+    return compute_stats(cache.data, cache.columns, today)
+
+def apply_filters(data, columns, filters, today):
+    """Apply filters to license data, given its columnar view and the date to judge status by"""
     if not filters:
         return data
     
-    filtered_data = data
+    mask = np.ones(len(data), dtype=bool)
     
     # Search filter
     search_term = filters.get('search', '').lower()
     if search_term:
-        filtered_data = [
-            item for item in filtered_data
-            if (search_term in item.get('firstName', '').lower() or
-                search_term in item.get('lastName', '').lower() or
-                search_term in item.get('licenseNumber', '').lower())
-        ]
+        mask &= np.char.find(columns['search_blob'], search_term) >= 0
     
     # State filter
     state_filter = filters.get('state', '')
     if state_filter:
-        filtered_data = [
-            item for item in filtered_data
-            if item.get('state', '').upper() == state_filter.upper()
-        ]
+        mask &= columns['state_upper'] == state_filter.upper()
     
     # Status filter
     status_filter = filters.get('status', '')
     if status_filter:
-        today = datetime.now().date()
-        
-        filtered_data = [
-            item for item in filtered_data
-            if check_license_status(item, status_filter, today)
-        ]
+        mask &= license_status_mask(columns, status_filter, today)
     
-    return filtered_data
+    return [data[i] for i in np.flatnonzero(mask)]
 
-def check_license_status(license_data, status, today):
-    """Check if license matches status filter"""
-    exp_date_str = license_data.get('expiration', '')
-    if not exp_date_str:
-        return False
+def license_status_mask(columns, status, today):
+    """Boolean mask of licenses matching the status filter"""
+    days, has_date = days_until_expiration(columns, today)
     
-    try:
-        exp_date = datetime.strptime(exp_date_str, '%Y-%m-%d').date()
-        days_until = (exp_date - today).days
-        
-        if status == 'valid':
-            return days_until > 30
-        elif status == 'expiring':
-            return 0 <= days_until <= 30
-        elif status == 'expired':
-            return days_until < 0
-        else:
-            return True
-    except:
-        return False
+    if status == 'valid':
+        return has_date & (days > 30)
+    elif status == 'expiring':
+        return has_date & (days >= 0) & (days <= 30)
+    elif status == 'expired':
+        return has_date & (days < 0)
+    else:
+        return has_date
+
+def pdf417_modules(codes, ratio=3):
+    """
+    2-D module matrix (1 = bar) for encoded PDF417 codes, with each
+    barcode row repeated `ratio` times to give it its bar height
+    """
+    rows = [''.join(format(value, 'b') for value in row) for row in codes]
+    bits = np.frombuffer(''.join(rows).encode('ascii'), dtype=np.uint8) - ord('0')
+    return np.repeat(bits.reshape(len(rows), -1), ratio, axis=0)
+
+def encode_pdf417(data):
+    """
+    PDF417 module matrix for data (1 = bar, rows stretched to bar height),
+    from zxing-cpp when available, else the pure-Python pdf417 package.
+    Both use 10 data columns and error correction level 2, so the symbols
+    have the same width, but they compact the data differently: row counts
+    and bar patterns can differ, which is why PDF417_BACKEND is in the ETag.
+    """
+    if zxingcpp is not None:
+        barcode = zxingcpp.create_barcode(data, zxingcpp.BarcodeFormat.PDF417, columns=10, ec_level='2')
+        pixels = np.asarray(barcode.to_image(scale=1, add_quiet_zones=False))
+        return (pixels == 0).astype(np.uint8)
+    
+    from pdf417 import encode
+    return pdf417_modules(encode(data, columns=10, security_level=2))
+
+def render_barcode(modules, scale=3, padding=20):
+    """Rasterize a module matrix to a padded grayscale pixel array in one pass"""
+    pixels = np.repeat(np.repeat(modules, scale, axis=0), scale, axis=1)
+    canvas = np.full((pixels.shape[0] + 2 * padding, pixels.shape[1] + 2 * padding), 255, dtype=np.uint8)
+    canvas[padding:-padding, padding:-padding] = (1 - pixels) * 255
+    return canvas
+
+@lru_cache(maxsize=512)
+def render_pdf417(data):
+    """Encode data as a PDF417 barcode and return PNG bytes (memoized per data string)"""
+    from PIL import Image
+    
+    # Encode data to PDF417 barcode and render as image
+    img = Image.fromarray(render_barcode(encode_pdf417(data), scale=3), 'L')
+    
+    # Encode PNG (fast compression; the image is mostly flat runs anyway)
+    img_buffer = BytesIO()
+    img.save(img_buffer, format='PNG', compress_level=1)
+    return img_buffer.getvalue()
 
 @app.route('/api/pdf417')
 def generate_pdf417():
@@ -295,49 +641,51 @@ def generate_pdf417():
         data = request.args.get('data', '')
         
         if not data:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": "No data provided"
-            }), 400
+            }, 400)
         
         try:
-            from pdf417 import encode, render_image
+            import PIL
+            if zxingcpp is None:
+                import pdf417
         except ImportError:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": "PDF417 library not available"
-            }), 500
+            }, 500)
         
         try:
-            # Encode data to PDF417 barcode
-            codes = encode(data, columns=10, security_level=2)
-            
-            # Render as image
-            img = render_image(codes, scale=3)
+            png = render_pdf417(data)
             
-            # Convert to base64
-            img_buffer = BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
+            # Legacy callers can still ask for a base64 data: URL wrapped in JSON
+            if request.args.get('format') == 'json':
+                img_base64 = base64.b64encode(png).decode()
+                return ojson({
+                    "success": True,
+                    "barcode": f"data:image/png;base64,{img_base64}",
+                    "type": "pdf417"
+                })
             
-            return jsonify({
-                "success": True,
-                "barcode": f"data:image/png;base64,{img_base64}",
-                "type": "pdf417"
-            })
+            # The image is a pure function of the data in the URL (and the encoder), so it can be cached forever
+            response = send_file(BytesIO(png), mimetype='image/png', etag=False)
+            digest = hashlib.blake2b(f"{PDF417_BACKEND}\0{data}".encode('utf-8'), digest_size=16)
+            response.set_etag(digest.hexdigest())
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+            return response.make_conditional(request)
         
         except Exception as barcode_error:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": f"PDF417 generation failed: {str(barcode_error)}"
-            }), 500
+            }, 500)
     
     except Exception as e:
-        return jsonify({
+        return ojson({
             "success": False,
             "error": f"Server error: {str(e)}"
-        }), 500
+        }, 500)
 
 @app.route('/api/barcode1d')
 def generate_barcode1d():
@@ -347,25 +695,25 @@ def generate_barcode1d():
         data = request.args.get('data', '')
         
         if not data:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": "No data provided"
-            }), 400
+            }, 400)
         
         if len(data) > 100:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": "Data too long (max 100 characters)"
-            }), 400
+            }, 400)
         
         try:
             import barcode
             from barcode.writer import ImageWriter
         except ImportError:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": "python-barcode library not available. Install with: pip install python-barcode"
-            }), 500
+            }, 500)
         
         # Map format names to barcode types
         format_map = {
@@ -376,10 +724,10 @@ def generate_barcode1d():
         }
         
         if barcode_format not in format_map:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": f"Unsupported barcode format: {barcode_format}"
-            }), 400
+            }, 400)
         
         try:
             # Generate 1D barcode using python-barcode
@@ -400,7 +748,7 @@ def generate_barcode1d():
             
             img_base64 = base64.b64encode(png_buffer.getvalue()).decode()
             
-            return jsonify({
+            return ojson({
                 "success": True,
                 "barcode": f"data:image/png;base64,{img_base64}",
                 "type": barcode_format,
@@ -408,16 +756,16 @@ def generate_barcode1d():
             })
         
         except Exception as barcode_error:
-            return jsonify({
+            return ojson({
                 "success": False,
                 "error": f"1D barcode generation failed: {str(barcode_error)}"
-            }), 500
+            }, 500)
     
     except Exception as e:
-        return jsonify({
+        return ojson({
             "success": False,
             "error": f"Server error: {str(e)}"
-        }), 500
+        }, 500)
 
 if __name__ == '__main__':
     print("🚀 Starting Driver's License Viewer Server")
@@ -430,4 +778,15 @@ if __name__ == '__main__':
     print(f"   GET /api/stats - Get statistics")
     print("\nPress Ctrl+C to stop\n")
     
-    app.run(debug=CONFIG["DEBUG"], port=5000)
\ No newline at end of file
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+    
+    if serve and not CONFIG["DEBUG"]:
+        # Production WSGI server with a worker thread pool, so requests blocked on
+        # Google Sheets or disk I/O don't hold up everyone else
+        print(f"🧵 Serving with waitress ({CONFIG['THREADS']} threads)")
+        serve(app, host=CONFIG["HOST"], port=5000, threads=CONFIG["THREADS"])
+    else:
+        app.run(debug=CONFIG["DEBUG"], host=CONFIG["HOST"], port=5000, threaded=True)
\ No newline at end of file